@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+""" Cumulative Band Power Index
+
+Precomputes the running integral of noise power over a spectrum so the
+RMS and peak-to-peak noise of any band is two table lookups instead of
+a new integration. Works on one spectrum or a batch of designs sharing
+the same frequency grid.
+
+Author: Douglass Murray
+
+"""
+import numpy as np
+
+
+def band_power_index(freqs, noise_density):
+    """Builds cumulative noise power table of spectral noise density.
+
+    Args:
+        freqs: ascending frequency grid, shape (n_freqs,) (Hz)
+        noise_density: spectral noise density on freqs, shape
+                       (..., n_freqs), one row per design (V/sqrt(Hz))
+
+    Returns:
+        cumulative_power: integrated noise power from freqs[0] up to each
+                          frequency, same shape as noise_density (V^2)
+    """
+    freqs = np.asarray(freqs, dtype=np.float64)
+    if freqs.ndim != 1 or freqs.size < 2:
+        raise ValueError("freqs must be a 1-D grid of at least 2 frequencies")
+    if np.any(np.diff(freqs) <= 0):
+        raise ValueError("freqs must be strictly increasing")
+    if np.shape(noise_density)[-1:] != freqs.shape:
+        raise ValueError("last axis of noise_density must match freqs")
+    noise_power_density = np.square(noise_density)  # V^2/Hz
+    # Trapezoid area of each grid step, then running sum from zero
+    step_power = (0.5 * np.diff(freqs)
+                  * (noise_power_density[..., 1:]
+                     + noise_power_density[..., :-1]))  # V^2
+    cumulative_power = np.zeros(np.shape(noise_power_density))
+    np.cumsum(step_power, axis=-1, out=cumulative_power[..., 1:])
+    return cumulative_power
+
+
+def cumulative_power_at_freq(freqs, cumulative_power, at_freq):
+    """Linearly interpolates cumulative noise power table at frequencies.
+
+    Args:
+        freqs: frequency grid used to build cumulative_power (Hz)
+        cumulative_power: table from band_power_index, shape
+                          (..., n_freqs) (V^2)
+        at_freq: frequencies to look up (Hz)
+
+    Returns:
+        power: cumulative noise power, shape (..., *np.shape(at_freq)),
+               NaN where at_freq is outside the grid (V^2)
+    """
+    freqs = np.asarray(freqs, dtype=np.float64)
+    if np.shape(cumulative_power)[-1:] != freqs.shape:
+        raise ValueError("last axis of cumulative_power must match freqs")
+    at_freq = np.asarray(at_freq, dtype=np.float64)
+    outside = (at_freq < freqs[0]) | (at_freq > freqs[-1])
+    lower = np.clip(np.searchsorted(freqs, at_freq, side='right') - 1,
+                    0, freqs.size - 2)
+    frac = (at_freq - freqs[lower]) / (freqs[lower + 1] - freqs[lower])
+    power_lower = np.take(cumulative_power, lower, axis=-1)
+    power_upper = np.take(cumulative_power, lower + 1, axis=-1)
+    power = power_lower + frac * (power_upper - power_lower)  # V^2
+    power = np.where(outside, np.nan, power)
+    return power
+
+
+def band_noise(freqs, cumulative_power, low_freq_of_interest,
+               high_freq_of_interest):
+    """RMS and peak-to-peak noise over frequency bands from power table.
+
+    Args:
+        freqs: frequency grid used to build cumulative_power (Hz)
+        cumulative_power: table from band_power_index, shape
+                          (..., n_freqs) (V^2)
+        low_freq_of_interest: low frequency of each band (Hz)
+        high_freq_of_interest: high frequency of each band (Hz)
+
+    Returns:
+        rms_noise: RMS noise of each design over each band,
+                   shape (..., n_bands), NaN for bands not inside the
+                   grid (Vrms)
+        noise_p_p: peak-to-peak noise of each design over each band (V)
+    """
+    if np.any(np.asarray(low_freq_of_interest)
+              > np.asarray(high_freq_of_interest)):
+        raise ValueError("low_freq_of_interest must not exceed "
+                         "high_freq_of_interest")
+    band_power = (cumulative_power_at_freq(freqs, cumulative_power,
+                                           high_freq_of_interest)
+                  - cumulative_power_at_freq(freqs, cumulative_power,
+                                             low_freq_of_interest))  # V^2
+    rms_noise = np.sqrt(band_power)  # Vrms
+    noise_p_p = 6.6 * rms_noise  # V
+    return rms_noise, noise_p_p
@@ -9,6 +9,8 @@ Author: Douglass Murray
 import os
 import numpy as np
 from opampnoiseanalysis.opampnoise import *
+from opampnoiseanalysis.noisekernels import (k, inverting_rti_kernel,
+                                             inverting_rti_terms)
 
 
 def inverting_topo_image_display():
@@ -61,31 +63,67 @@ def inverting_rti_noise(r_source, r_one, r_two, r_three, vnoise_low_hz,
     # set inoise_at_hz to 0 as default
     inoise_at_hz = 0 if inoise_at_hz is None else inoise_at_hz
     temp = 20 if temp is None else temp  # set temp to room temp as default
-    gain = r_two / r_one
     # Op-amp specific parameters based on datasheet
     opamp_vnoise = opamp_vnoise_at_freq(vnoise_low_hz, vnoise_high_hz, at_freq)
     opamp_inoise = opamp_inoise_at_freq(inoise_low_hz, inoise_high_hz,
                                         at_freq, inoise_at_hz)
 
-    # RTI Noise Contributions (V/sqrt(Hz))
-    inverted_input_rti_noise = (opamp_inoise * (r_source + r_one) * r_two
-                                / (r_source + r_one + r_two))  # V/sqrt(Hz)
-    # Direct contribution in inverted topology
-    noninverted_input_rti_noise = opamp_vnoise  # V/sqrt(Hz)
-    r_three_noise = resistor_noise(r_three, temp)  # V/sqrt(Hz)
-    r_two_noise = resistor_noise(r_two, temp) / gain  # V/sqrt(Hz)
-    r_one_noise = resistor_noise(r_one, temp)  # V/sqrt(Hz)
-    r_source_noise = resistor_noise(r_source, temp)  # V/sqrt(Hz)
-
-    rti_noise = gain * np.sqrt(np.square(inverted_input_rti_noise)
-                               + np.square(noninverted_input_rti_noise)
-                               + np.square(r_three_noise)
-                               + np.square(r_two_noise)
-                               + np.square(r_one_noise)
-                               + np.square(r_source_noise))  # V/sqrt(Hz)
+    # Contributor math and RSS fused in one pass (compiled if available)
+    rti_noise = inverting_rti_kernel(r_source, r_one, r_two, r_three,
+                                     opamp_vnoise, opamp_inoise,
+                                     temp)  # V/sqrt(Hz)
     return rti_noise
 
 
+def inverting_integrated_terms(r_source, r_one, r_two, r_three,
+                               low_freq_of_interest, high_freq_of_interest,
+                               amp_gain_bandwidth, opamp_vnoise,
+                               opamp_inoise, temp):
+    """Contributor terms of inverting op-amp integrated noise.
+
+    Shared by the integrated noise value and its analytic gradient.
+
+    Args:
+        r_source: Source resistance
+        r_one: Input resistor
+        r_two: Feedback resistor
+        r_three: Noninverted input resistor (which is usally tied to GND)
+        low_freq_of_interest: low frequency of user interest
+        high_freq_of_interest: high frequency of user interest
+        amp_gain_bandwidth: op-amp unity gain bandwidth (based on datasheet)
+        opamp_vnoise: op-amp voltage noise at frequency (V/sqrt(Hz))
+        opamp_inoise: op-amp current noise at frequency (A/sqrt(Hz))
+        temp: temperature in C of resistors
+
+    Returns:
+        gain: closed loop gain, R2 / R1
+        thermal: resistor noise power per Ohm, 4kT (V^2/(Hz Ohm))
+        max_noise_bandwidth: maximum noise bandwidth (Hz)
+        bandwidth_limited: True where max_noise_bandwidth is below the
+                           high freq of interest
+        bandwidth: resistor noise integration bandwidth (Hz)
+        r_parallel: R1 || R2 seen by op-amp current noise (Ohm)
+        r_sum: thermal noise resistance, R2 referred as R2 / gain^4 (Ohm)
+        noise_power: integrated noise power before gain (Vrms^2)
+    """
+    gain = r_two / r_one
+    thermal = 4 * k * (temp + 273)  # V^2/(Hz Ohm)
+    max_noise_bandwidth = 1.57 * amp_gain_bandwidth / gain
+    # Resistor noise is integrated up to the lower of the two limits
+    bandwidth_limited = max_noise_bandwidth < high_freq_of_interest
+    bandwidth = (np.where(bandwidth_limited, max_noise_bandwidth,
+                          high_freq_of_interest)
+                 - low_freq_of_interest)  # Hz
+    r_parallel = r_one * r_two / (r_one + r_two)  # Ohm
+    r_sum = (r_source + r_one + r_three
+             + np.power(r_one, 4) / np.power(r_two, 3))  # Ohm
+    # Direct op-amp voltage noise contribution in inverted topology
+    noise_power = (thermal * bandwidth * r_sum + np.square(opamp_vnoise)
+                   + np.square(opamp_inoise * r_parallel))  # Vrms^2
+    return (gain, thermal, max_noise_bandwidth, bandwidth_limited, bandwidth,
+            r_parallel, r_sum, noise_power)
+
+
 # Integrated Noise over frequency (Vrms)
 def inverting_integrated_noise(r_source, r_one, r_two, r_three,
                                low_freq_of_interest, high_freq_of_interest,
@@ -121,53 +159,191 @@ def inverting_integrated_noise(r_source, r_one, r_two, r_three,
     # set inoise_at_hz to 0 as default
     inoise_at_hz = 0 if inoise_at_hz is None else inoise_at_hz
     temp = 20 if temp is None else temp  # set temp to room temp as default
-    gain = r_two / r_one
-    max_noise_bandwidth = 1.57 * amp_gain_bandwidth / gain
-    r_three_noise = resistor_noise(r_three, temp)  # V/sqrt(Hz)
-    r_two_noise = resistor_noise(r_two, temp) / gain  # V/sqrt(Hz)
-    r_one_noise = resistor_noise(r_one, temp)  # V/sqrt(Hz)
-    r_source_noise = resistor_noise(r_source, temp)  # V/sqrt(Hz)
     # Op-amp specific parameters based on datasheet
     opamp_vnoise = opamp_vnoise_at_freq(vnoise_low_hz, vnoise_high_hz, at_freq)
     opamp_inoise = opamp_inoise_at_freq(inoise_low_hz, inoise_high_hz, at_freq,
                                         inoise_at_hz)
 
-    if max_noise_bandwidth < high_freq_of_interest:
-        r_source_integrated_noise = (r_source_noise
-                                     * np.sqrt(max_noise_bandwidth
-                                     - low_freq_of_interest))  # Vrms
-        r_one_integrated_noise = (r_one_noise
-                                  * np.sqrt(max_noise_bandwidth
-                                  - low_freq_of_interest))  # Vrms
-        r_two_integrated_noise = (np.sqrt(max_noise_bandwidth
-                                          - low_freq_of_interest)
-                                          * r_two_noise / gain)  # Vrms
-        r_three_integrated_noise = (r_three_noise
-                                    * np.sqrt(max_noise_bandwidth
-                                    - low_freq_of_interest))  # Vrms
-    else:
-        r_source_integrated_noise = (r_source_noise
-                                     * np.sqrt(high_freq_of_interest
-                                     - low_freq_of_interest))  # Vrms
-        r_one_integrated_noise = (r_one_noise
-                                  * np.sqrt(high_freq_of_interest
-                                  - low_freq_of_interest))  # Vrms
-        r_two_integrated_noise = (np.sqrt(high_freq_of_interest
-                                          - low_freq_of_interest)
-                                          * r_two_noise / gain)  # Vrms
-        r_three_integrated_noise = (r_three_noise
-                                    * np.sqrt(high_freq_of_interest
-                                    - low_freq_of_interest))  # Vrms
-
-    # Vrms, direct contribution in inverted topology
-    noninverted_input_integrated_noise = opamp_vnoise
-    inverted_input_integrated_noise = (opamp_inoise * r_one
-                                       * r_two / (r_one + r_two))  # Vrms
-
-    integrated_noise = (gain * np.sqrt(np.square(r_source_integrated_noise)
-                                       + np.square(r_one_integrated_noise)
-                                       + np.square(r_two_integrated_noise)
-                                       + np.square(r_three_integrated_noise)
-                                       + np.square(noninverted_input_integrated_noise)
-                                       + np.square(inverted_input_integrated_noise)))  # Vrms
+    # Resistor noise over the lower of max noise BW and high freq of interest
+    (gain, _, max_noise_bandwidth, _, _, _, _,
+     noise_power) = inverting_integrated_terms(r_source, r_one, r_two,
+                                               r_three, low_freq_of_interest,
+                                               high_freq_of_interest,
+                                               amp_gain_bandwidth,
+                                               opamp_vnoise, opamp_inoise,
+                                               temp)
+    integrated_noise = gain * np.sqrt(noise_power)  # Vrms
     return max_noise_bandwidth, integrated_noise
+
+
+# RTI Total Noise and its partial derivatives
+def inverting_rti_noise_gradient(r_source, r_one, r_two, r_three,
+                                 vnoise_low_hz, vnoise_high_hz,
+                                 inoise_low_hz, inoise_high_hz,
+                                 at_freq=None, inoise_at_hz=None, temp=None):
+    """Calculates RTI noise of inverting op-amp topology and its analytic
+       partial derivatives in one vectorized pass.
+
+    Args:
+        r_source: Source resistance
+        r_one: Input resistor
+        r_two: Feedback resistor
+        r_three: Noninverted input resistor (which is usally tied to GND)
+        vnoise_low_hz: op-amp voltage noise at low freq (based on datasheet)
+        vnoise_high_hz: op-amp voltage noise at high freq (based on datasheet)
+        inoise_low_hz: op-amp current noise at low freq (based on datasheet)
+        inoise_high_hz: op-amp current noise at high freq (based on datasheet)
+        at_freq: user specified frequency
+        inoise_at_hz: must be 0 or None, JFET-input current noise is not
+                      supported by the gradient
+        temp: temperature in C of resistors, default 20 (room temp)
+
+    Returns:
+        rti_noise: total RTI noise (V/sqrt(Hz))
+        rti_noise_grad: dict of d(rti_noise)/d(arg) keyed by argument name
+    """
+    # set at_freq to 1 kHz as default
+    at_freq = 1000 if at_freq is None else at_freq
+    if np.any(inoise_at_hz):
+        raise ValueError("RTI noise gradient only supports inoise_at_hz=0")
+    temp = 20 if temp is None else temp  # set temp to room temp as default
+    # Op-amp specific parameters based on datasheet (1/f current noise)
+    opamp_vnoise = opamp_vnoise_at_freq(vnoise_low_hz, vnoise_high_hz, at_freq)
+    opamp_inoise = opamp_inoise_at_freq(inoise_low_hz, inoise_high_hz,
+                                        at_freq)
+
+    (gain, thermal, inverted_input_rti_noise, r_sum,
+     noise_power) = inverting_rti_terms(r_source, r_one, r_two, r_three,
+                                        opamp_vnoise, opamp_inoise, temp)
+    noise_rss = np.sqrt(noise_power)
+    rti_noise = gain * noise_rss  # V/sqrt(Hz)
+
+    # d(noise_power)/d(arg)
+    r_input = r_source + r_one
+    r_loop = r_source + r_one + r_two
+    d_inverted_d_input = opamp_inoise * np.square(r_two / r_loop)
+    d_inverted_d_two = opamp_inoise * np.square(r_input / r_loop)
+    d_power = {
+        'r_source': (2 * inverted_input_rti_noise * d_inverted_d_input
+                     + thermal),
+        'r_one': (2 * inverted_input_rti_noise * d_inverted_d_input
+                  + thermal * (2 * r_one / r_two + 1)),
+        'r_two': (2 * inverted_input_rti_noise * d_inverted_d_two
+                  - thermal * np.square(r_one / r_two)),
+        'r_three': thermal,
+        'temp': thermal / (temp + 273) * r_sum,
+        'vnoise_low_hz': 2 * vnoise_low_hz / at_freq,
+        'vnoise_high_hz': 2 * vnoise_high_hz,
+        'inoise_low_hz': (2 * np.square(r_input * r_two / r_loop)
+                          * inoise_low_hz),
+        'inoise_high_hz': (2 * np.square(r_input * r_two / r_loop)
+                           * inoise_high_hz / at_freq),
+    }
+    # rti = gain * sqrt(power), gain depends on R1 and R2 only
+    rti_noise_grad = {name: gain * d / (2 * noise_rss)
+                      for name, d in d_power.items()}
+    rti_noise_grad['r_one'] = (rti_noise_grad['r_one']
+                               - gain / r_one * noise_rss)
+    rti_noise_grad['r_two'] = (rti_noise_grad['r_two']
+                               + noise_rss / r_one)
+    return rti_noise, rti_noise_grad
+
+
+# Integrated Noise over frequency and its partial derivatives
+def inverting_integrated_noise_gradient(r_source, r_one, r_two, r_three,
+                                        low_freq_of_interest,
+                                        high_freq_of_interest,
+                                        amp_gain_bandwidth, vnoise_low_hz,
+                                        vnoise_high_hz, inoise_low_hz,
+                                        inoise_high_hz, at_freq=None,
+                                        inoise_at_hz=None, temp=None):
+    """Calculates integrated noise of inverting op-amp topology and its
+       analytic partial derivatives in one vectorized pass.
+
+    Args:
+        r_source: Source resistance
+        r_one: Input resistor
+        r_two: Feedback resistor
+        r_three: Noninverted input resistor (which is usally tied to GND)
+        low_freq_of_interest: low frequency of user interest
+        high_freq_of_interest: high frequency of user interest
+        amp_gain_bandwidth: op-amp unity gain bandwidth (based on datasheet)
+        vnoise_low_hz: op-amp voltage noise at low freq (based on datasheet)
+        vnoise_high_hz: op-amp voltage noise at high freq (based on datasheet)
+        inoise_low_hz: op-amp current noise at low freq (based on datasheet)
+        inoise_high_hz: op-amp current noise at high freq (based on datasheet)
+        at_freq: user specified frequency
+        inoise_at_hz: must be 0 or None, JFET-input current noise is not
+                      supported by the gradient
+        temp: temperature in C of resistors, default 20 (room temp)
+
+    Returns:
+        max_noise_bandwidth: maximum noise bandwidth
+        integrated_noise: integrated noise over user's frequency of interest
+        integrated_noise_grad: dict of d(integrated_noise)/d(arg) keyed by
+                               argument name
+    """
+    # set at_freq to 1 kHz as default
+    at_freq = 1000 if at_freq is None else at_freq
+    if np.any(inoise_at_hz):
+        raise ValueError("Integrated noise gradient only supports "
+                         "inoise_at_hz=0")
+    temp = 20 if temp is None else temp  # set temp to room temp as default
+    # Op-amp specific parameters based on datasheet (1/f current noise)
+    opamp_vnoise = opamp_vnoise_at_freq(vnoise_low_hz, vnoise_high_hz, at_freq)
+    opamp_inoise = opamp_inoise_at_freq(inoise_low_hz, inoise_high_hz,
+                                        at_freq)
+
+    (gain, thermal, max_noise_bandwidth, bandwidth_limited, bandwidth,
+     r_parallel, r_sum,
+     noise_power) = inverting_integrated_terms(r_source, r_one, r_two,
+                                               r_three, low_freq_of_interest,
+                                               high_freq_of_interest,
+                                               amp_gain_bandwidth,
+                                               opamp_vnoise, opamp_inoise,
+                                               temp)
+    noise_rss = np.sqrt(noise_power)
+    integrated_noise = gain * noise_rss  # Vrms
+
+    # d(bandwidth)/d(arg), nonzero only when op-amp bandwidth limits
+    d_bandwidth_d_one = np.where(bandwidth_limited,
+                                 1.57 * amp_gain_bandwidth / r_two, 0)
+    d_bandwidth_d_two = np.where(bandwidth_limited,
+                                 -max_noise_bandwidth / r_two, 0)
+    d_bandwidth_d_gbw = np.where(bandwidth_limited, 1.57 / gain, 0)
+    d_bandwidth_d_high = np.where(bandwidth_limited, 0, 1)
+
+    # d(noise_power)/d(arg)
+    inverted_input_integrated_noise = opamp_inoise * r_parallel
+    d_parallel_d_one = np.square(r_two / (r_one + r_two))
+    d_parallel_d_two = np.square(r_one / (r_one + r_two))
+    d_power = {
+        'r_source': thermal * bandwidth,
+        'r_one': (thermal * d_bandwidth_d_one * r_sum
+                  + thermal * bandwidth
+                  * (1 + 4 * np.power(r_one / r_two, 3))
+                  + 2 * inverted_input_integrated_noise
+                  * opamp_inoise * d_parallel_d_one),
+        'r_two': (thermal * d_bandwidth_d_two * r_sum
+                  - 3 * thermal * bandwidth * np.power(r_one / r_two, 4)
+                  + 2 * inverted_input_integrated_noise
+                  * opamp_inoise * d_parallel_d_two),
+        'r_three': thermal * bandwidth,
+        'temp': thermal / (temp + 273) * bandwidth * r_sum,
+        'low_freq_of_interest': -thermal * r_sum,
+        'high_freq_of_interest': thermal * d_bandwidth_d_high * r_sum,
+        'amp_gain_bandwidth': thermal * d_bandwidth_d_gbw * r_sum,
+        'vnoise_low_hz': 2 * vnoise_low_hz / at_freq,
+        'vnoise_high_hz': 2 * vnoise_high_hz,
+        'inoise_low_hz': 2 * np.square(r_parallel) * inoise_low_hz,
+        'inoise_high_hz': (2 * np.square(r_parallel) * inoise_high_hz
+                           / at_freq),
+    }
+    # integrated = gain * sqrt(power), gain depends on R1 and R2 only
+    integrated_noise_grad = {name: gain * d / (2 * noise_rss)
+                             for name, d in d_power.items()}
+    integrated_noise_grad['r_one'] = (integrated_noise_grad['r_one']
+                                      - gain / r_one * noise_rss)
+    integrated_noise_grad['r_two'] = (integrated_noise_grad['r_two']
+                                      + noise_rss / r_one)
+    return max_noise_bandwidth, integrated_noise, integrated_noise_grad
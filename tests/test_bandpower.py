@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from opampnoiseanalysis.bandpower import band_power_index, band_noise
+
+FREQS = np.geomspace(0.1, 1e6, 20001)
+
+
+def opamp_noise_density(opamp_noise, noise_corner_freq):
+    return opamp_noise * np.sqrt(1 + noise_corner_freq / FREQS)
+
+
+def trapezoid_rms(noise_density, low_freq, high_freq):
+    band = (FREQS >= low_freq) & (FREQS <= high_freq)
+    return np.sqrt(np.trapezoid(np.square(noise_density[..., band]),
+                                FREQS[band], axis=-1))
+
+
+# Band edges are on the grid so trapezoid over the slice is exact
+LOW_FREQS = FREQS[[0, 2000, 4000, 0]]  # 0.1, 1, 10, 0.1 Hz
+HIGH_FREQS = FREQS[[4000, 12000, 16000, -1]]  # 10 Hz, 10 kHz, 100 kHz, 1 MHz
+
+
+def test_band_noise_matches_trapezoid():
+    noise_density = opamp_noise_density(0.9e-9, 10)
+    cumulative_power = band_power_index(FREQS, noise_density)
+    rms_noise, noise_p_p = band_noise(FREQS, cumulative_power, LOW_FREQS,
+                                      HIGH_FREQS)
+    expected = [trapezoid_rms(noise_density, low, high)
+                for low, high in zip(LOW_FREQS, HIGH_FREQS)]
+    np.testing.assert_allclose(rms_noise, expected, rtol=1e-9)
+    np.testing.assert_allclose(noise_p_p, 6.6 * rms_noise)
+
+
+def test_band_noise_batch_of_designs():
+    noise_density = np.stack([opamp_noise_density(0.9e-9, 10),
+                              opamp_noise_density(3.2e-9, 100),
+                              opamp_noise_density(18e-9, 2)])
+    cumulative_power = band_power_index(FREQS, noise_density)
+    rms_noise, _ = band_noise(FREQS, cumulative_power, LOW_FREQS, HIGH_FREQS)
+    assert rms_noise.shape == (3, 4)
+    for low, high, column in zip(LOW_FREQS, HIGH_FREQS, rms_noise.T):
+        np.testing.assert_allclose(column,
+                                   trapezoid_rms(noise_density, low, high),
+                                   rtol=1e-9)
+
+
+def test_band_noise_off_grid_edges():
+    noise_density = opamp_noise_density(0.9e-9, 10)
+    cumulative_power = band_power_index(FREQS, noise_density)
+    rms_noise, _ = band_noise(FREQS, cumulative_power, 0.25, 470)
+    # White plus 1/f noise integrated analytically
+    expected = 0.9e-9 * np.sqrt(470 - 0.25 + 10 * np.log(470 / 0.25))
+    np.testing.assert_allclose(rms_noise, expected, rtol=1e-6)
+
+
+def test_band_noise_rejects_reversed_band():
+    cumulative_power = band_power_index(FREQS, opamp_noise_density(1e-9, 10))
+    with pytest.raises(ValueError):
+        band_noise(FREQS, cumulative_power, [1, 100], [10, 10])
+
+
+def test_band_noise_outside_grid_is_nan():
+    cumulative_power = band_power_index(FREQS, opamp_noise_density(1e-9, 10))
+    rms_noise, _ = band_noise(FREQS, cumulative_power, [2e6, 0.01, 1],
+                              [3e6, 10, 10])
+    assert np.isnan(rms_noise[0]) and np.isnan(rms_noise[1])
+    assert rms_noise[2] > 0
+
+
+@pytest.mark.parametrize('freqs', [[1.0], [1.0, 10.0, 10.0], [10.0, 1.0]])
+def test_band_power_index_rejects_bad_grid(freqs):
+    with pytest.raises(ValueError):
+        band_power_index(freqs, np.ones(len(freqs)))
+
+
+def test_band_power_index_rejects_mismatched_spectrum():
+    with pytest.raises(ValueError):
+        band_power_index([1.0, 10.0], np.ones((3, 5)))
+
+
+def test_band_noise_rejects_mismatched_table():
+    cumulative_power = band_power_index(FREQS, opamp_noise_density(1e-9, 10))
+    with pytest.raises(ValueError):
+        band_noise(FREQS[::2], cumulative_power, 1, 10)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from opampnoiseanalysis.inverting import (
+    inverting_rti_noise, inverting_rti_noise_gradient,
+    inverting_integrated_noise, inverting_integrated_noise_gradient)
+
+RTI_DESIGN = dict(r_source=50.0, r_one=1e3, r_two=10e3, r_three=900.0,
+                  vnoise_low_hz=20e-9, vnoise_high_hz=3e-9,
+                  inoise_low_hz=0.4e-12, inoise_high_hz=6e-12,
+                  at_freq=100.0, temp=40.0)
+
+
+def central_difference(func, design, name):
+    step = abs(design[name]) * 1e-4
+    upper = dict(design, **{name: design[name] + step})
+    lower = dict(design, **{name: design[name] - step})
+    return (func(**upper) - func(**lower)) / (2 * step)
+
+
+def test_rti_noise_gradient_value():
+    rti_noise, _ = inverting_rti_noise_gradient(**RTI_DESIGN)
+    np.testing.assert_allclose(rti_noise, inverting_rti_noise(**RTI_DESIGN),
+                               rtol=1e-12)
+
+
+def test_rti_noise_gradient_matches_finite_difference():
+    _, rti_noise_grad = inverting_rti_noise_gradient(**RTI_DESIGN)
+    assert set(rti_noise_grad) == set(RTI_DESIGN) - {'at_freq'}
+    for name, partial in rti_noise_grad.items():
+        expected = central_difference(
+            lambda **design: inverting_rti_noise_gradient(**design)[0],
+            RTI_DESIGN, name)
+        np.testing.assert_allclose(partial, expected, rtol=1e-6,
+                                   err_msg=name)
+
+
+@pytest.mark.parametrize('amp_gain_bandwidth', [1e6, 1e3])
+def test_integrated_noise_gradient_matches_finite_difference(
+        amp_gain_bandwidth):
+    # 1e6 Hz integrates to the high freq of interest, 1e3 Hz is BW limited.
+    # Larger current noise keeps its term resolvable by finite differences
+    design = dict(RTI_DESIGN, inoise_low_hz=4e-12, inoise_high_hz=60e-12,
+                  low_freq_of_interest=1.0,
+                  high_freq_of_interest=1e4,
+                  amp_gain_bandwidth=amp_gain_bandwidth)
+    (max_noise_bandwidth, integrated_noise,
+     integrated_noise_grad) = inverting_integrated_noise_gradient(**design)
+    assert ((max_noise_bandwidth, integrated_noise)
+            == pytest.approx(inverting_integrated_noise(**design),
+                             rel=1e-12))
+    assert set(integrated_noise_grad) == set(design) - {'at_freq'}
+    for name, partial in integrated_noise_grad.items():
+        expected = central_difference(
+            lambda **design: inverting_integrated_noise_gradient(**design)[1],
+            design, name)
+        np.testing.assert_allclose(partial, expected, rtol=1e-6, atol=1e-20,
+                                   err_msg=name)
+
+
+def test_gradient_is_vectorized():
+    r_two = np.array([1e3, 10e3, 100e3])
+    rti_noise, rti_noise_grad = inverting_rti_noise_gradient(
+        **dict(RTI_DESIGN, r_two=r_two))
+    for i, value in enumerate(r_two):
+        single, single_grad = inverting_rti_noise_gradient(
+            **dict(RTI_DESIGN, r_two=value))
+        assert rti_noise[i] == pytest.approx(single, rel=1e-12)
+        for name, partial in single_grad.items():
+            assert rti_noise_grad[name][i] == pytest.approx(partial,
+                                                            rel=1e-12)
+
+
+def test_gradient_rejects_jfet_current_noise():
+    with pytest.raises(ValueError):
+        inverting_rti_noise_gradient(**dict(RTI_DESIGN, inoise_at_hz=100))
+    with pytest.raises(ValueError):
+        inverting_integrated_noise_gradient(
+            **dict(RTI_DESIGN, low_freq_of_interest=1.0,
+                   high_freq_of_interest=1e4, amp_gain_bandwidth=1e6,
+                   inoise_at_hz=100))
+
+
+def test_gradient_positional_args_match_value_functions():
+    args = (50.0, 1e3, 10e3, 900.0, 20e-9, 3e-9, 0.4e-12, 6e-12, 100.0, 0,
+            40.0)
+    rti_noise, _ = inverting_rti_noise_gradient(*args)
+    assert rti_noise == pytest.approx(inverting_rti_noise(*args), rel=1e-12)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from opampnoiseanalysis import noisekernels
+
+pytest.importorskip("numba")
+
+
+def check_kernel_matches_numpy(*args):
+    shape = np.broadcast_shapes(*(np.shape(arg) for arg in args))
+    assert np.prod(shape) >= noisekernels.compiled_min_size
+    rti_noise = noisekernels.inverting_rti_kernel(*args)
+    expected = noisekernels.inverting_rti_numpy(*args)
+    assert rti_noise.shape == expected.shape
+    np.testing.assert_allclose(rti_noise, expected, rtol=1e-13, atol=0)
+
+
+def test_compiled_kernel_selected():
+    assert noisekernels.compiled_kernels_available()
+
+
+def test_kernel_matches_numpy_flat():
+    rng = np.random.default_rng(0)
+    n = 3 * noisekernels.compiled_min_size + 7
+    check_kernel_matches_numpy(rng.uniform(0, 10e3, n),
+                               rng.uniform(100, 10e3, n),
+                               rng.uniform(1e3, 1e6, n),
+                               rng.uniform(0, 10e3, n),
+                               rng.uniform(1e-9, 20e-9, n),
+                               rng.uniform(1e-15, 5e-12, n),
+                               rng.uniform(-40, 125, n))
+
+
+def test_kernel_matches_numpy_scalar_mixed():
+    n = noisekernels.compiled_min_size + 1
+    check_kernel_matches_numpy(50.0, np.linspace(100, 10e3, n), 47e3, 0.0,
+                               3.2e-9, 400e-15, 85)
+
+
+def test_kernel_matches_numpy_2d_broadcast():
+    r_one = np.geomspace(100, 100e3, 150)[:, np.newaxis]
+    r_two = np.geomspace(1e3, 1e6, 120)
+    temp = np.linspace(-40, 125, 120)[::-1]  # non-contiguous input
+    check_kernel_matches_numpy(1e3, r_one, r_two, 2.1e3, 8e-9, 2e-12, temp)
+
+
+def test_kernel_falls_back_when_compile_fails(monkeypatch):
+    def broken(*args):
+        raise RuntimeError("no compiler")
+
+    monkeypatch.setattr(noisekernels, "_inverting_rti_compiled", broken)
+    monkeypatch.setattr(noisekernels, "_use_compiled", None)
+    r_one = np.linspace(100, 10e3, noisekernels.compiled_min_size)
+    rti_noise = noisekernels.inverting_rti_kernel(50.0, r_one, 10e3, 0.0,
+                                                  3e-9, 1e-12, 20)
+    assert not noisekernels.compiled_kernels_available()
+    np.testing.assert_array_equal(
+        rti_noise, noisekernels.inverting_rti_numpy(50.0, r_one, 10e3, 0.0,
+                                                    3e-9, 1e-12, 20))
+
+
+@pytest.mark.parametrize('offset', [-1, 0])
+def test_kernel_inputs_same_either_side_of_threshold(offset):
+    n = noisekernels.compiled_min_size + offset
+    r_one = np.linspace(100, 10e3, n, dtype=np.float32)
+    rti_noise = noisekernels.inverting_rti_kernel([50.0], r_one, 10e3, 0.0,
+                                                  3e-9, 1e-12, 20)
+    assert rti_noise.dtype == np.float64
+    assert rti_noise.shape == (n,)